@@ -1,7 +1,9 @@
+import httpx
+import pyarrow as pa
 import streamlit as st
-import requests
 
 API_URL = "http://127.0.0.1:8000"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
 st.title("Search and Operations of Sales")
 
 
@@ -9,6 +11,15 @@ st.title("Search and Operations of Sales")
 if 'token' not in st.session_state:
     st.session_state['token'] = None
 
+# Reuse one keep-alive HTTP client across reruns instead of opening a connection per call
+if 'client' not in st.session_state:
+    st.session_state['client'] = httpx.Client(
+        base_url=API_URL,
+        timeout=30,
+        limits=httpx.Limits(max_keepalive_connections=10)
+    )
+client = st.session_state['client']
+
 
 def login():
     """
@@ -23,7 +34,7 @@ def login():
     password = st.text_input("Enter your password", type="password")
     if st.button("Login"):
         try:
-            response = requests.post(f"{API_URL}/auth/login", json={"email": email, "password": password})
+            response = client.post("/auth/login", json={"email": email, "password": password})
             response_data = response.json()
             if response.status_code == 200:
                 st.success("Successfully logged in!")
@@ -57,7 +68,7 @@ if st.session_state['token']:
         Handles the response from API requests.
 
         Args:
-            response (requests.Response): The HTTP response object.
+            response (httpx.Response): The HTTP response object.
 
         Displays the response data as JSON if the request was successful. Otherwise,
         it shows an error message with the status code and error text.
@@ -67,6 +78,22 @@ if st.session_state['token']:
         else:
             st.error(f"Error: {response.status_code} - {response.text}")
 
+    def handle_table_response(response):
+        """
+        Handles the response from API requests that return sales records.
+
+        Args:
+            response (httpx.Response): The HTTP response object.
+
+        Decodes the Arrow IPC stream returned by the API and displays it as a table if
+        the request was successful. Otherwise, it shows an error message with the status
+        code and error text.
+        """
+        if response.status_code == 200:
+            st.dataframe(pa.ipc.open_stream(response.content).read_all().to_pandas())
+        else:
+            st.error(f"Error: {response.status_code} - {response.text}")
+
     if action == "Search sales by employee":
         start_date = st.date_input("Start date").strftime("%Y-%m-%d")
         end_date = st.date_input("End date").strftime("%Y-%m-%d")
@@ -77,8 +104,10 @@ if st.session_state['token']:
                 "start_date": start_date,
                 "end_date": end_date
             }
-            response = requests.get(f"{API_URL}/sales/employee/", headers=headers, params=params)
-            handle_response(response)
+            response = client.get("/sales/employee/",
+                                  headers={**headers, "Accept": ARROW_STREAM_MEDIA_TYPE},
+                                  params=params)
+            handle_table_response(response)
 
     elif action == "Search sales by product":
         start_date = st.date_input("Start date").strftime("%Y-%m-%d")
@@ -90,8 +119,10 @@ if st.session_state['token']:
                 "start_date": start_date,
                 "end_date": end_date
             }
-            response = requests.get(f"{API_URL}/sales/product/", headers=headers, params=params)
-            handle_response(response)
+            response = client.get("/sales/product/",
+                                  headers={**headers, "Accept": ARROW_STREAM_MEDIA_TYPE},
+                                  params=params)
+            handle_table_response(response)
 
     elif action == "Search sales by Store":
         start_date = st.date_input("Start date").strftime("%Y-%m-%d")
@@ -103,33 +134,35 @@ if st.session_state['token']:
                 "start_date": start_date,
                 "end_date": end_date
             }
-            response = requests.get(f"{API_URL}/sales/store/", headers=headers, params=params)
-            handle_response(response)
+            response = client.get("/sales/store/",
+                                  headers={**headers, "Accept": ARROW_STREAM_MEDIA_TYPE},
+                                  params=params)
+            handle_table_response(response)
 
     elif action == "Total and average sales by store":
         key_store = st.text_input("KeyStore")
         if st.button("Total and average sales by store"):
             params = {"key_store": key_store}
-            response = requests.get(f"{API_URL}/sales/store/total_avg/", headers=headers, params=params)
+            response = client.get("/sales/store/total_avg/", headers=headers, params=params)
             handle_response(response)
 
     elif action == "Total and average sales product":
         key_product = st.text_input("KeyProduct")
         if st.button("Total and average sales product"):
             params = {"key_product": key_product}
-            response = requests.get(f"{API_URL}/sales/product/total_avg/", headers=headers, params=params)
+            response = client.get("/sales/product/total_avg/", headers=headers, params=params)
             handle_response(response)
 
     elif action == "Total and average sales employee":
         key_employee = st.text_input("KeyEmployee")
         if st.button("Total and average sales employee"):
             params = {"key_employee": key_employee}
-            response = requests.get(f"{API_URL}/sales/employee/total_avg/", headers=headers, params=params)
+            response = client.get("/sales/employee/total_avg/", headers=headers, params=params)
             handle_response(response)
 
     elif action == "First row test":
         if st.button("First row test"):
-            response = requests.get(f"{API_URL}/sales/first_record/", headers=headers)
+            response = client.get("/sales/first_record/", headers=headers)
             handle_response(response)
 else:
     login()
@@ -0,0 +1,57 @@
+"""
+This module locates and recompresses the parquet chunks of the datamart.
+
+It only touches the parquet files, so it can be imported or run without loading the
+datamart. Running it as a script rewrites the Snappy chunks with Zstd:
+
+    python -m app.chunks
+
+Functions:
+    - find_chunk_files()
+    -> list[str]: Retrieves one parquet file per chunk, preferring its Zstd copy.
+    - recompress_chunks()
+    -> None: Rewrites every Snappy parquet chunk as a Zstd chunk next to it.
+"""
+
+import glob
+import os
+
+import pyarrow.parquet as pq
+
+
+FILE_PATH = 'app/data/'
+
+
+def find_chunk_files() -> list[str]:
+    """
+    Retrieves the parquet file of every chunk, preferring its Zstd copy over its Snappy one.
+
+    Returns:
+        list[str]: The sorted paths of the parquet files, one per chunk.
+    """
+    chunks = {file: file for file in glob.glob(FILE_PATH + "data_chunk*.snappy.parquet")}
+    for file in glob.glob(FILE_PATH + "data_chunk*.zstd.parquet"):
+        chunks[file.replace('.zstd.', '.snappy.')] = file
+    return sorted(chunks.values())
+
+
+def recompress_chunks():
+    """
+    Rewrites every Snappy parquet chunk as a Zstd level 3 chunk next to it.
+
+    This is a one-time offline step. Zstd chunks are smaller and decompress faster than
+    Snappy ones once they are in the page cache, and the next start picks them up and
+    rebuilds the Arrow IPC file from them. Each chunk is written under a temporary name
+    and then renamed, so an interrupted run never leaves a partial Zstd chunk behind.
+    Deleting a Zstd chunk rolls that chunk back to its Snappy copy.
+    """
+    for file in glob.glob(FILE_PATH + "data_chunk*.snappy.parquet"):
+        target = file.replace('.snappy.', '.zstd.')
+        pq.write_table(pq.read_table(file), target + '.tmp',
+                       compression='zstd', compression_level=3, use_dictionary=True,
+                       data_page_size=1 << 20)
+        os.replace(target + '.tmp', target)
+
+
+if __name__ == '__main__':
+    recompress_chunks()
@@ -1,19 +1,139 @@
 """
-This module loads and concatenates parquet files into a single pandas DataFrame.
+This module loads the parquet files into a single pandas DataFrame.
 
 It performs the following operations:
-- Defines the file path for parquet files.
-- Retrieves all file paths matching the pattern for parquet files.
-- Reads each parquet file into a pandas DataFrame.
-- Concatenates all individual DataFrames into a single DataFrame.
+- Retrieves one parquet file per chunk from app.chunks, preferring the Zstd-compressed
+  copy written by recompress_chunks and falling back to the Snappy one for chunks
+  without it.
+- Opens the parquet files as a single pyarrow dataset, decoding the column chunks on
+  pyarrow's thread pool, and caches the result as an Arrow IPC file that records the
+  name, modification time and size of every parquet file it was built from.
+- Memory-maps the Arrow IPC file and converts it into one DataFrame with pyarrow-backed
+  dtypes, so the parquet files are only decoded when that list changes, string and struct
+  columns stay in Arrow memory instead of becoming Python objects, and the OS can share
+  the mapped pages between worker processes.
+- Converts the KeyDate column to datetime64 once and sorts the rows by it, so date
+  ranges can be located with a binary search over the dates in day units, then stores
+  it as an Arrow date, so it is served as YYYY-MM-DD rather than as a timestamp.
+- Stores the key columns as categoricals and builds row-position indexes for them,
+  so lookups by key avoid full scans.
+- Extracts the NetAmount of each ticket into a dense float64 array kept outside the
+  DataFrame, so it is not served as a column, and caches the total and average
+  NetAmount of every key on first use, so the totals endpoints are served from a
+  dictionary lookup.
 """
 
-import glob
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from app.chunks import FILE_PATH, find_chunk_files
+
+
+ARROW_FILE = FILE_PATH + 'datamart.arrow'
+SOURCES_KEY = b'datamart_sources'
+all_files = find_chunk_files()
+
+
+def sources_signature() -> bytes:
+    """
+    Describes the parquet files the Arrow IPC file is built from.
+
+    Returns:
+        bytes: A JSON list of the name, modification time and size of every parquet file.
+    """
+    sources = []
+    for file in sorted(all_files):
+        stat = os.stat(file)
+        sources.append([os.path.basename(file), stat.st_mtime_ns, stat.st_size])
+    return json.dumps(sources).encode()
+
+
+def build_arrow_file(signature: bytes):
+    """
+    Reads the parquet files and writes them to the Arrow IPC file, sorted by KeyDate.
+
+    The signature of the parquet files is stored in the schema metadata of the file. The
+    file is written under a temporary name and then renamed, so worker processes starting
+    at the same time never map a partially written file.
+
+    Args:
+        signature (bytes): The signature of the parquet files, from sources_signature.
+    """
+    source_table = ds.dataset(all_files, format='parquet').to_table(use_threads=True)
+    source_table = source_table.sort_by('KeyDate')
+    source_table = source_table.replace_schema_metadata(
+        {**(source_table.schema.metadata or {}), SOURCES_KEY: signature})
+    temp_file = f'{ARROW_FILE}.{os.getpid()}.tmp'
+    with pa.OSFile(temp_file, 'wb') as sink, pa.ipc.new_file(sink, source_table.schema) as writer:
+        writer.write_table(source_table)
+    os.replace(temp_file, ARROW_FILE)
+
+
+def load_table() -> pa.Table:
+    """
+    Memory-maps the Arrow IPC file, rebuilding it first if the parquet files have changed.
+
+    The file is rebuilt when a parquet file has been added, removed, replaced or modified
+    since it was written. Without any parquet file, an existing Arrow IPC file is used as is.
+
+    Returns:
+        pa.Table: The datamart table, backed by the memory-mapped file.
+
+    Raises:
+        FileNotFoundError: If there are neither parquet files nor an Arrow IPC file.
+    """
+    if not all_files:
+        if not os.path.exists(ARROW_FILE):
+            raise FileNotFoundError(f'No parquet files or Arrow IPC file found in {FILE_PATH}')
+        return pa.ipc.open_file(pa.memory_map(ARROW_FILE, 'r')).read_all()
+    signature = sources_signature()
+    if os.path.exists(ARROW_FILE):
+        reader = pa.ipc.open_file(pa.memory_map(ARROW_FILE, 'r'))
+        if (reader.schema.metadata or {}).get(SOURCES_KEY) == signature:
+            return reader.read_all()
+    build_arrow_file(signature)
+    return pa.ipc.open_file(pa.memory_map(ARROW_FILE, 'r')).read_all()
+
+
+table = load_table()
+df = table.to_pandas(use_threads=True, types_mapper=pd.ArrowDtype)
+df['KeyDate'] = pd.to_datetime(df['KeyDate']).astype('datetime64[ns]')
+df = df.sort_values('KeyDate', kind='stable', ignore_index=True)
+DATES = df['KeyDate'].to_numpy().astype('datetime64[D]')
+df['KeyDate'] = df['KeyDate'].astype(pd.ArrowDtype(pa.date32()))
+
+KEY_COLUMNS = ('KeyEmployee', 'KeyProduct', 'KeyStore')
+for column in KEY_COLUMNS:
+    df[column] = df[column].astype('category')
+
+KEY_INDEX = {column: df.groupby(column, sort=False, observed=True).indices
+             for column in KEY_COLUMNS}
+EMPTY_INDEX = np.empty(0, dtype=np.int64)
+
+NET_AMOUNT = df['Tickets'].struct.field('NetAmount').to_numpy(dtype=np.float64,
+                                                              na_value=np.nan)
+
+
+@lru_cache(maxsize=None)
+def totals_by(key_column: str) -> dict:
+    """
+    Aggregates the total and average NetAmount of every key of a key column.
 
+    The datamart is static, so each column is grouped once, on its first request, and
+    the same lookup table is returned afterwards.
 
-FILE_PATH = 'app/data/'
-all_files = glob.glob(FILE_PATH + "data_chunk*.snappy.parquet")
+    Args:
+        key_column (str): The key column to group by.
 
-df_list = [pd.read_parquet(file) for file in all_files]
-df = pd.concat(df_list, ignore_index=True)
+    Returns:
+        dict: A dictionary mapping each key to a (total, average) tuple of NetAmount floats.
+    """
+    net_amount = pd.Series(NET_AMOUNT, index=df.index)
+    totals = net_amount.groupby(df[key_column], observed=True).agg(['sum', 'mean'])
+    return dict(zip(totals.index, zip(totals['sum'].tolist(), totals['mean'].tolist())))
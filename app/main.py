@@ -3,69 +3,105 @@ This module sets up and configures the FastAPI application, including middleware
 and routes for various functionalities.
 
 The main components are:
-- FastAPI app initialization with custom settings.
-- Middleware for handling authentication and authorization.
-- Custom endpoint for retrieving the OpenAPI schema.
+- FastAPI app initialization with custom settings, serializing JSON responses with orjson.
+- Pure ASGI middleware for handling authentication and authorization.
+- Custom endpoints for retrieving the OpenAPI schema and the Swagger UI docs.
 - Inclusion of authentication and sales routers.
 """
 
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI
+from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.routers import auth, sales
 from app.routers.utils import get_openapi_schema
-from firebase_config import verify_token_local
+from firebase_config import get_admin_app, verify_token_local
 
+# The built-in OpenAPI and docs routes are disabled in favour of the custom ones below,
+# which serve the cached static schema.
 app = FastAPI(
     title="Search and Operations of Sales",
-    docs_url="/docs"
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None,
+    default_response_class=ORJSONResponse
 )
 
 
-app.openapi_schema = get_openapi_schema()
+app.openapi = get_openapi_schema
 
-excluded_paths = ["/auth/login", "/docs", "/openapi.json"]
+EXCLUDED_PATHS = frozenset({"/auth/login", "/docs", "/openapi.json"})
 
 
-@app.middleware("http")
-async def auth_middleware(request: Request, call_next):
+class AuthMiddleware:
     """
-    Middleware to handle authentication by checking the Authorization header.
+    Pure ASGI middleware to handle authentication by checking the Authorization header.
 
     This middleware extracts the JWT token from the Authorization header,
     verifies it, and attaches the decoded token data to the request state.
-    If the token is missing or invalid, it raises an HTTP 401 Unauthorized error.
+    If the token is missing or invalid, it responds with an HTTP 401 Unauthorized error.
 
-    Args:
-        request (Request): The incoming HTTP request.
-        call_next (Callable): The function to call for the next middleware or endpoint.
+    Unlike a BaseHTTPMiddleware, it reads the headers straight from the ASGI scope and
+    does not wrap the request and response in extra tasks and streams.
+    """
 
-    Raises:
-        HTTPException: If the token is invalid or missing.
+    def __init__(self, app: ASGIApp):  # pylint: disable=redefined-outer-name
+        self.app = app
 
-    Returns:
-        Response: The HTTP response after processing the request.
-    """
-    if request.url.path not in excluded_paths:
-        try:
-            token = request.headers.get("Authorization").split("Bearer ")[1]
-            decoded_token = verify_token_local(token)
-            request.state.user = decoded_token
-        except  Exception as exc:
-            raise HTTPException(status_code=401, detail='Invalid or missing credentials') from exc
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Authenticates HTTP requests to non-excluded paths before passing them on.
+
+        Args:
+            scope (Scope): The ASGI connection scope.
+            receive (Receive): The ASGI receive channel.
+            send (Send): The ASGI send channel.
+        """
+        if scope["type"] == "http" and scope["path"] not in EXCLUDED_PATHS:
+            # Initialize Firebase outside the try, so a misconfigured server fails with a
+            # 500 instead of reporting every request as unauthenticated.
+            get_admin_app()
+            try:
+                token = Headers(scope=scope).get("Authorization").split("Bearer ")[1]
+                decoded_token = verify_token_local(token)
+            except Exception:  # pylint: disable=broad-except
+                response = ORJSONResponse({"detail": "Invalid or missing credentials"},
+                                          status_code=401)
+                await response(scope, receive, send)
+                return
+            scope.setdefault("state", {})["user"] = decoded_token
 
-    response = await call_next(request)
-    return response
+        await self.app(scope, receive, send)
 
 
-@app.get("/openapi.json")
+app.add_middleware(AuthMiddleware)
+
+
+@app.get("/openapi.json", include_in_schema=False)
 async def openapi():
     """
     Endpoint to retrieve the OpenAPI schema for the FastAPI application.
 
+    The cached schema dictionary is rendered by orjson directly, without going through
+    FastAPI's jsonable_encoder first.
+
+    Returns:
+        ORJSONResponse: The OpenAPI schema in JSON format.
+    """
+    return ORJSONResponse(app.openapi())
+
+
+@app.get("/docs", include_in_schema=False)
+async def docs() -> HTMLResponse:
+    """
+    Endpoint to retrieve the Swagger UI documentation for the FastAPI application.
+
     Returns:
-        dict: The OpenAPI schema in JSON format.
+        HTMLResponse: The Swagger UI page, loading the schema from /openapi.json.
     """
-    return app.openapi()
+    return get_swagger_ui_html(openapi_url="/openapi.json", title=f"{app.title} - Swagger UI")
 
 
 app.include_router(auth.router, prefix="/auth")
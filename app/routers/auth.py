@@ -6,7 +6,7 @@ It includes:
 """
 
 from fastapi import APIRouter, HTTPException
-from firebase_config import firebase_auth
+from firebase_config import get_firebase_auth
 
 from app.models import LoginSchema
 
@@ -28,7 +28,7 @@ def login(request: LoginSchema):
         HTTPException: If authentication fails or an error occurs.
     """
     try:
-        user = firebase_auth.sign_in_with_email_and_password(request.email, request.password)
+        user = get_firebase_auth().sign_in_with_email_and_password(request.email, request.password)
         return {"token": user['idToken']}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
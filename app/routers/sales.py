@@ -3,36 +3,27 @@ This module contains the routes for retrieving and processing sales data.
 
 It includes:
 - Endpoints for retrieving sales data by employee, product, store.
-- Endpoints for calculating total and average sales by employee, product, store.
+- Endpoints for retrieving the cached total and average sales by employee, product, store.
 - Endpoint for retrieving the first record from the dataframe.
+
+The pandas work of the endpoints runs in a worker thread, including the first build of the
+cached totals, so the event loop stays free to accept other requests while it runs.
 """
 
-import glob
-from contextlib import asynccontextmanager
+import asyncio
+
+import numpy as np
 import pandas as pd
 
-from fastapi import APIRouter, HTTPException
-from app.routers.utils import calculate_totals_and_averages, validate_dates
-from app.datamart import df
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.routers.utils import dataframe_response, format_totals, validate_dates, validate_fields
+from app.datamart import df, table, DATES, KEY_INDEX, EMPTY_INDEX, totals_by
 
 router = APIRouter()
 
 
-FILE_PATH = 'app/data/'
-all_files = glob.glob(FILE_PATH + "data_chunk*.snappy.parquet")
-
-
-@asynccontextmanager
-async def lifespan():
-    """
-    Manages the lifespan of the FastAPI application. Used for setup and teardown tasks.
-    """
-    df_list = [pd.read_parquet(file) for file in all_files]
-    global df
-    df = pd.concat(df_list, ignore_index=True)
-    yield
-
-def filter_dataframe(key: str, start_date: str, end_date: str, key_column: str) -> pd.DataFrame:
+def filter_dataframe(key: str, start_date: str, end_date: str, key_column: str,
+                     fields: list[str] | None = None) -> pd.DataFrame:
     """
     Filters the dataframe based on a specific key, start date, end date, and key column.
 
@@ -41,124 +32,164 @@ def filter_dataframe(key: str, start_date: str, end_date: str, key_column: str)
         start_date (str): The start date for filtering.
         end_date (str): The end date for filtering.
         key_column (str): The column to filter by.
+        fields (list[str] | None): The columns to return, or None for all columns.
 
     Returns:
         pd.DataFrame: The filtered dataframe.
     """
     start_date_dt, end_date_dt = validate_dates(start_date, end_date)
-    df['KeyDate'] = pd.to_datetime(df['KeyDate']).dt.date
-    return df[(df[key_column] == key) &
-              (df['KeyDate'] >= start_date_dt) &
-              (df['KeyDate'] <= end_date_dt)]
+    columns = validate_fields(fields, df.columns)
+    # The rows are sorted by KeyDate and each key's row positions are ascending, so the
+    # date range is a contiguous slice of both and can be found by binary search.
+    date_bounds = np.searchsorted(DATES, [start_date_dt, end_date_dt + np.timedelta64(1, 'D')])
+    rows = KEY_INDEX[key_column].get(key, EMPTY_INDEX)
+    start_row, end_row = np.searchsorted(rows, date_bounds)
+    return df.iloc[rows[start_row:end_row], columns]
 
 
 @router.get("/employee/")
-def get_sales_by_employee(key_employee: str, start_date: str, end_date: str):
+async def get_sales_by_employee(request: Request, key_employee: str,
+                                start_date: str, end_date: str,
+                                fields: list[str] | None = Query(None)):
     """
     Retrieves sales data for a specific employee within a given date range.
 
     Args:
+        request (Request): The incoming HTTP request, used for content negotiation.
         key_employee (str): The employee's key to filter by.
         start_date (str): The start date for filtering.
         end_date (str): The end date for filtering.
+        fields (list[str] | None): The columns to return. All columns if omitted.
 
     Returns:
-        List[dict]: A list of dictionaries representing the sales data.
+        Response: The sales data as a JSON array of records, or as an Arrow IPC stream
+        or NDJSON if the client accepts it.
     """
-    filtered_df = filter_dataframe(key_employee, start_date, end_date, 'KeyEmployee')
+    filtered_df = await asyncio.to_thread(filter_dataframe, key_employee, start_date, end_date,
+                                          'KeyEmployee', fields)
     if len(filtered_df) == 0:
         raise HTTPException(status_code=404,
                             detail="No sales data found for the given employee and date range.")
-    return filtered_df.to_dict(orient='records')
+    return await asyncio.to_thread(dataframe_response, filtered_df,
+                                   request.headers.get('accept', ''))
 
 
 @router.get("/product/")
-def get_sales_by_product(key_product: str, start_date: str, end_date: str):
+async def get_sales_by_product(request: Request, key_product: str,
+                               start_date: str, end_date: str,
+                               fields: list[str] | None = Query(None)):
     """
     Retrieves sales data for a specific product within a given date range.
 
     Args:
+        request (Request): The incoming HTTP request, used for content negotiation.
         key_product (str): The product's key to filter by.
         start_date (str): The start date for filtering.
         end_date (str): The end date for filtering.
+        fields (list[str] | None): The columns to return. All columns if omitted.
 
     Returns:
-        List[dict]: A list of dictionaries representing the sales data.
+        Response: The sales data as a JSON array of records, or as an Arrow IPC stream
+        or NDJSON if the client accepts it.
     """
-    filtered_df = filter_dataframe(key_product, start_date, end_date, 'KeyProduct')
+    filtered_df = await asyncio.to_thread(filter_dataframe, key_product, start_date, end_date,
+                                          'KeyProduct', fields)
     if len(filtered_df) == 0:
         raise HTTPException(status_code=404,
                             detail="No sales data found for the given product and date range.")
-    return filtered_df.to_dict(orient='records')
+    return await asyncio.to_thread(dataframe_response, filtered_df,
+                                   request.headers.get('accept', ''))
 
 
 @router.get("/store/")
-def get_sales_by_store(key_store: str, start_date: str, end_date: str):
+async def get_sales_by_store(request: Request, key_store: str,
+                             start_date: str, end_date: str,
+                             fields: list[str] | None = Query(None)):
     """
     Retrieves sales data for a specific store within a given date range.
 
     Args:
+        request (Request): The incoming HTTP request, used for content negotiation.
         key_store (str): The store's key to filter by.
         start_date (str): The start date for filtering.
         end_date (str): The end date for filtering.
+        fields (list[str] | None): The columns to return. All columns if omitted.
 
     Returns:
-        List[dict]: A list of dictionaries representing the sales data.
+        Response: The sales data as a JSON array of records, or as an Arrow IPC stream
+        or NDJSON if the client accepts it.
     """
-    filtered_df = filter_dataframe(key_store, start_date, end_date, 'KeyStore')
+    filtered_df = await asyncio.to_thread(filter_dataframe, key_store, start_date, end_date,
+                                          'KeyStore', fields)
     if len(filtered_df) == 0:
         raise HTTPException(status_code=404,
                             detail="No sales data found for the given store and date range.")
-    return filtered_df.to_dict(orient='records')
+    return await asyncio.to_thread(dataframe_response, filtered_df,
+                                   request.headers.get('accept', ''))
 
 
 @router.get("/store/total_avg/")
-def get_total_avg_sales_by_store(key_store: str):
+async def get_total_avg_sales_by_store(key_store: str):
     """
     Retrieves total and average sales data for a specific store.
 
     Args:
-        key_store (str): The store's key to filter by.
+        key_store (str): The store's key to look up.
 
     Returns:
         dict: A dictionary containing total and average sales data.
+
+    Raises:
+        HTTPException: If there are no sales for the store, raises a 404 error.
     """
-    filtered_df = df[df['KeyStore'] == key_store]
-    return calculate_totals_and_averages(filtered_df)
+    totals = (await asyncio.to_thread(totals_by, 'KeyStore')).get(key_store)
+    if totals is None:
+        raise HTTPException(status_code=404, detail="No sales data found for the given store.")
+    return format_totals(*totals)
 
 
 @router.get("/product/total_avg/")
-def get_total_avg_sales_by_product(key_product: str):
+async def get_total_avg_sales_by_product(key_product: str):
     """
     Retrieves total and average sales data for a specific product.
 
     Args:
-        key_product (str): The product's key to filter by.
+        key_product (str): The product's key to look up.
 
     Returns:
         dict: A dictionary containing total and average sales data.
+
+    Raises:
+        HTTPException: If there are no sales for the product, raises a 404 error.
     """
-    filtered_df = df[df['KeyProduct'] == key_product]
-    return calculate_totals_and_averages(filtered_df)
+    totals = (await asyncio.to_thread(totals_by, 'KeyProduct')).get(key_product)
+    if totals is None:
+        raise HTTPException(status_code=404, detail="No sales data found for the given product.")
+    return format_totals(*totals)
 
 
 @router.get("/employee/total_avg/")
-def get_total_avg_sales_by_employee(key_employee: str):
+async def get_total_avg_sales_by_employee(key_employee: str):
     """
     Retrieves total and average sales data for a specific employee.
 
     Args:
-        key_employee (str): The employee's key to filter by.
+        key_employee (str): The employee's key to look up.
 
     Returns:
         dict: A dictionary containing total and average sales data.
+
+    Raises:
+        HTTPException: If there are no sales for the employee, raises a 404 error.
     """
-    filtered_df = df[df['KeyEmployee'] == key_employee]
-    return calculate_totals_and_averages(filtered_df)
+    totals = (await asyncio.to_thread(totals_by, 'KeyEmployee')).get(key_employee)
+    if totals is None:
+        raise HTTPException(status_code=404, detail="No sales data found for the given employee.")
+    return format_totals(*totals)
 
 
 @router.get("/first_record/")
-def get_first_record():
+async def get_first_record():
     """
     Retrieves the first record from the dataframe.
 
@@ -168,7 +199,12 @@ def get_first_record():
     Raises:
         HTTPException: If no data is available, raises a 404 error.
     """
-    if len(df.index) == 0:
+    if table.num_rows == 0:
         raise HTTPException(status_code=404, detail="No data available.")
-    first_record = df.iloc[0].to_dict()
+    # The Arrow table is sorted by KeyDate like the dataframe, so its first row is the
+    # dataframe's first row. Reading it from Arrow skips building pandas objects, and
+    # missing values come back as None. Only KeyDate is taken from the dataframe, where
+    # it has been converted to a date.
+    first_record = table.slice(0, 1).to_pylist()[0]
+    first_record['KeyDate'] = df['KeyDate'].iat[0]
     return first_record
@@ -4,16 +4,32 @@ This module provides functions for validating dates and calculating sales metric
 Functions:
     - validate_dates(start_date: str, end_date: str)
     -> tuple: Validates and parses the start and end dates.
-    - calculate_totals_and_averages(filtered_df: pd.DataFrame)
-    -> dict: Calculates total and average sales from a filtered DataFrame.
+    - validate_fields(fields: list[str] | None, columns: pd.Index)
+    -> np.ndarray | slice: Validates the requested fields and returns their positions.
+    - format_totals(total_sales: float, average_sales: float)
+    -> dict: Formats total and average sales as currency strings.
+    - dataframe_response(filtered_df: pd.DataFrame, accept: str)
+    -> Response: Serializes a DataFrame as Arrow IPC, NDJSON or JSON records.
     - get_openapi_schema()
     -> generates the OpenAPI schema for the sales and authentication endpoints.
 """
 
-from datetime import datetime
+import re
+from datetime import date
+from functools import lru_cache
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+
+
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+NDJSON_CHUNK_ROWS = 10000
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}', re.ASCII)
 
 
 def validate_dates(start_date: str, end_date: str):
@@ -25,46 +41,313 @@ def validate_dates(start_date: str, end_date: str):
         end_date (str): The end date in YYYY-MM-DD format.
 
     Returns:
-        tuple: A tuple containing two datetime.date objects (start_date, end_date).
+        tuple: A tuple containing two day-precision numpy.datetime64 objects
+        (start_date, end_date). Day precision covers every valid year, where nanoseconds
+        would overflow outside 1677-2262.
 
     Raises:
         HTTPException: If the date format is invalid.
     """
+    # Reject malformed strings with a cheap pattern check before parsing. The parser
+    # still catches well-formed but impossible dates such as 2023-02-30.
+    if not (_DATE_RE.fullmatch(start_date) and _DATE_RE.fullmatch(end_date)):
+        raise HTTPException(status_code=400, detail='Invalid date format. Use YYYY-MM-DD.')
     try:
-        start_date_dt = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date_dt = datetime.strptime(end_date, '%Y-%m-%d').date()
+        start_date_dt = np.datetime64(date.fromisoformat(start_date), 'D')
+        end_date_dt = np.datetime64(date.fromisoformat(end_date), 'D')
     except ValueError as exc:
         raise HTTPException(status_code=400, detail='Invalid date format. Use YYYY-MM-DD.') from exc
     return start_date_dt, end_date_dt
 
 
-def calculate_totals_and_averages(filtered_df: pd.DataFrame) -> dict:
+def validate_fields(fields: list[str] | None, columns: pd.Index):
     """
-    Calculates the total and average sales from a filtered DataFrame.
+    Validates the requested fields against the available columns.
 
     Args:
-        filtered_df (pd.DataFrame): A DataFrame containing sales data.
+        fields (list[str] | None): The column names to return, or None for all columns.
+        columns (pd.Index): The columns of the DataFrame being queried.
 
     Returns:
-        dict: A dictionary with total and average sales formatted as strings.
+        np.ndarray | slice: The positions of the requested columns, in the order they were
+        first requested, or a slice selecting every column if no fields were requested.
 
     Raises:
-        HTTPException: If no sales data is found in the DataFrame.
+        HTTPException: If any of the requested fields is not a column.
+    """
+    if not fields:
+        return slice(None)
+    # Drop repeated fields, which would otherwise produce duplicate column names.
+    fields = list(dict.fromkeys(fields))
+    positions = columns.get_indexer(fields)
+    if (positions == -1).any():
+        unknown = [field for field, position in zip(fields, positions) if position == -1]
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}.")
+    return positions
+
+
+def format_totals(total_sales: float, average_sales: float) -> dict:
+    """
+    Formats the total and average sales as currency strings.
+
+    Args:
+        total_sales (float): The total sales amount.
+        average_sales (float): The average sales amount.
+
+    Returns:
+        dict: A dictionary with total and average sales formatted as strings.
     """
-    if len(filtered_df.columns) == 0:
-        raise HTTPException(status_code=404, detail="No sales data found.")
-    total_sales = filtered_df['Tickets'].apply(lambda x: x['NetAmount']).sum()
-    average_sales = filtered_df['Tickets'].apply(lambda x: x['NetAmount']).mean()
     return {
         "total_sales": f"${total_sales:,.2f}",
         "average_sales": f"${average_sales:,.2f}"
     }
 
 
+def _json_default(value):
+    """
+    Serializes the values orjson does not handle natively, such as pandas timestamps.
+
+    Args:
+        value: The value to serialize.
+
+    Returns:
+        str: The ISO 8601 representation of the timestamp.
+
+    Raises:
+        TypeError: If the value is not a timestamp.
+    """
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError
+
+
+def iter_ndjson(filtered_df: pd.DataFrame):
+    """
+    Yields the rows of a DataFrame as newline-delimited JSON, one chunk of rows at a time.
+
+    Args:
+        filtered_df (pd.DataFrame): The DataFrame to serialize.
+
+    Yields:
+        bytes: The JSON lines for up to NDJSON_CHUNK_ROWS records.
+    """
+    for start in range(0, len(filtered_df), NDJSON_CHUNK_ROWS):
+        chunk = filtered_df.iloc[start:start + NDJSON_CHUNK_ROWS]
+        yield b''.join(orjson.dumps(record, default=_json_default,
+                                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+                       for record in chunk.to_dict(orient='records'))
+
+
+def dataframe_response(filtered_df: pd.DataFrame, accept: str):
+    """
+    Serializes a DataFrame in the format requested by the client.
+
+    Args:
+        filtered_df (pd.DataFrame): The DataFrame to serialize.
+        accept (str): The value of the request's Accept header.
+
+    Returns:
+        Response: An Arrow IPC stream response if the client accepts
+        application/vnd.apache.arrow.stream, a streamed NDJSON response if it accepts
+        application/x-ndjson, otherwise a JSON array of records. The JSON body is rendered
+        here with orjson, so FastAPI's jsonable_encoder does not walk the records again on
+        the event loop.
+    """
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        table = pa.Table.from_pandas(filtered_df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), media_type=ARROW_STREAM_MEDIA_TYPE)
+    if NDJSON_MEDIA_TYPE in accept:
+        return StreamingResponse(iter_ndjson(filtered_df), media_type=NDJSON_MEDIA_TYPE)
+    return Response(orjson.dumps(filtered_df.to_dict(orient='records'), default=_json_default,
+                                 option=orjson.OPT_SERIALIZE_NUMPY),
+                    media_type='application/json')
+
+
+# Fragments shared by the paths of the OpenAPI schema. They are built once at import and
+# referenced, not copied, by every path that uses them, so they must not be mutated.
+_BEARER_SEC = [
+    {
+        "BearerAuth": []
+    }
+]
+
+_DATE_PARAMS = (
+    {
+        "name": "start_date",
+        "in": "query",
+        "required": True,
+        "schema": {
+            "type": "string",
+            "format": "date"
+        }
+    },
+    {
+        "name": "end_date",
+        "in": "query",
+        "required": True,
+        "schema": {
+            "type": "string",
+            "format": "date"
+        }
+    }
+)
+
+_FIELDS_PARAM = {
+    "name": "fields",
+    "in": "query",
+    "required": False,
+    "description": "Columns to return. All columns if omitted.",
+    "schema": {
+        "type": "array",
+        "items": {
+            "type": "string"
+        }
+    }
+}
+
+_SALES_200 = {
+    "description": "Sales data retrieved successfully",
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "additionalProperties": True
+                }
+            }
+        },
+        ARROW_STREAM_MEDIA_TYPE: {
+            "schema": {
+                "type": "string",
+                "format": "binary"
+            }
+        },
+        NDJSON_MEDIA_TYPE: {
+            "schema": {
+                "type": "object",
+                "additionalProperties": True
+            }
+        }
+    }
+}
+
+_SALES_400 = {
+    "description": "Invalid date format or unknown fields."
+}
+
+_TOTALS_200 = {
+    "description": "Total and average sales data retrieved successfully",
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "total_sales": {
+                        "type": "string",
+                        "example": "$1,234.56"
+                    },
+                    "average_sales": {
+                        "type": "string",
+                        "example": "$123.45"
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+def _key_param(name: str) -> dict:
+    """
+    Builds the required query parameter for a key.
+
+    Args:
+        name (str): The name of the query parameter.
+
+    Returns:
+        dict: The OpenAPI parameter object.
+    """
+    return {
+        "name": name,
+        "in": "query",
+        "required": True,
+        "schema": {
+            "type": "string"
+        }
+    }
+
+
+def _sales_path(key_name: str, summary: str, description: str, not_found: str) -> dict:
+    """
+    Builds the OpenAPI path item of a date-range sales endpoint.
+
+    Args:
+        key_name (str): The name of the key query parameter.
+        summary (str): The summary of the operation.
+        description (str): The description of the operation.
+        not_found (str): The description of the 404 response.
+
+    Returns:
+        dict: The OpenAPI path item.
+    """
+    return {
+        "get": {
+            "summary": summary,
+            "description": description,
+            "parameters": [_key_param(key_name), *_DATE_PARAMS, _FIELDS_PARAM],
+            "responses": {
+                "200": _SALES_200,
+                "400": _SALES_400,
+                "404": {
+                    "description": not_found
+                }
+            },
+            "security": _BEARER_SEC
+        }
+    }
+
+
+def _totals_path(key_name: str, summary: str, description: str, not_found: str) -> dict:
+    """
+    Builds the OpenAPI path item of a total and average sales endpoint.
+
+    Args:
+        key_name (str): The name of the key query parameter.
+        summary (str): The summary of the operation.
+        description (str): The description of the operation.
+        not_found (str): The description of the 404 response.
+
+    Returns:
+        dict: The OpenAPI path item.
+    """
+    return {
+        "get": {
+            "summary": summary,
+            "description": description,
+            "parameters": [_key_param(key_name)],
+            "responses": {
+                "200": _TOTALS_200,
+                "404": {
+                    "description": not_found
+                }
+            },
+            "security": _BEARER_SEC
+        }
+    }
+
+
+@lru_cache(maxsize=1)
 def get_openapi_schema():
     """
     Generates the OpenAPI schema for the sales and authentication endpoints.
 
+    The schema is static, so it is built on the first call and the same dictionary is
+    returned afterwards. Callers must not mutate it.
+
     Returns:
         dict: The OpenAPI schema as a dictionary.
     """
@@ -75,318 +358,42 @@ def get_openapi_schema():
             "version": "1.0.0"
         },
         "paths": {
-            "/sales/employee": {
-                "get": {
-                    "summary": "Get sales data by employee",
-                    "description": "Retrieve sales data for a specific employee in a date range.",
-                    "parameters": [
-                        {
-                            "name": "key_employee",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string"
-                            }
-                        },
-                        {
-                            "name": "start_date",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string",
-                                "format": "date"
-                            }
-                        },
-                        {
-                            "name": "end_date",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string",
-                                "format": "date"
-                            }
-                        }
-                    ],
-                    "responses": {
-                        "200": {
-                            "description": "Sales data retrieved successfully",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "array",
-                                        "items": {
-                                            "type": "object",
-                                            "additionalProperties": True
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "404": {
-                            "description": "No sales found for the given employee and date range."
-                        }
-                    },
-                    "security": [
-                        {
-                            "BearerAuth": []
-                        }
-                    ]
-                }
-            },
-            "/sales/product/": {
-                "get": {
-                    "summary": "Get sales data by product",
-                    "description": "Retrieve sales for a specific product within a date range.",
-                    "parameters": [
-                        {
-                            "name": "key_product",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string"
-                            }
-                        },
-                        {
-                            "name": "start_date",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string",
-                                "format": "date"
-                            }
-                        },
-                        {
-                            "name": "end_date",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string",
-                                "format": "date"
-                            }
-                        }
-                    ],
-                    "responses": {
-                        "200": {
-                            "description": "Sales data retrieved successfully",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "array",
-                                        "items": {
-                                            "type": "object",
-                                            "additionalProperties": True
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "404": {
-                            "description": "No sales found for the given product and date range."
-                        }
-                    },
-                    "security": [
-                        {
-                            "BearerAuth": []
-                        }
-                    ]
-                }
-            },
-            "/sales/store/": {
-                "get": {
-                    "summary": "Get sales data by store",
-                    "description": "Retrieve sales data for a specific store within a date range.",
-                    "parameters": [
-                        {
-                            "name": "key_store",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string"
-                            }
-                        },
-                        {
-                            "name": "start_date",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string",
-                                "format": "date"
-                            }
-                        },
-                        {
-                            "name": "end_date",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string",
-                                "format": "date"
-                            }
-                        }
-                    ],
-                    "responses": {
-                        "200": {
-                            "description": "Sales data retrieved successfully",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "array",
-                                        "items": {
-                                            "type": "object",
-                                            "additionalProperties": True
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "404": {
-                            "description": "No sales data found for the given store and date range."
-                        }
-                    },
-                    "security": [
-                        {
-                            "BearerAuth": []
-                        }
-                    ]
-                }
-            },
-            "/sales/store/total_avg/": {
-                "get": {
-                    "summary": "Get total and average sales by store",
-                    "description": "Retrieve total and average sales amounts for a specific store.",
-                    "parameters": [
-                        {
-                            "name": "key_store",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string"
-                            }
-                        }
-                    ],
-                    "responses": {
-                        "200": {
-                            "description": "Total and average sales data retrieved successfully",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "total_sales": {
-                                                "type": "string",
-                                                "example": "$1,234.56"
-                                            },
-                                            "average_sales": {
-                                                "type": "string",
-                                                "example": "$123.45"
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "404": {
-                            "description": "No sales data found for the given store."
-                        }
-                    },
-                    "security": [
-                        {
-                            "BearerAuth": []
-                        }
-                    ]
-                }
-            },
-            "/sales/product/total_avg/": {
-                "get": {
-                    "summary": "Get total and average sales by product",
-                    "description": "Retrieve total and average sales amounts for a spec product.",
-                    "parameters": [
-                        {
-                            "name": "key_product",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string"
-                            }
-                        }
-                    ],
-                    "responses": {
-                        "200": {
-                            "description": "Total and average sales data retrieved successfully",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "total_sales": {
-                                                "type": "string",
-                                                "example": "$1,234.56"
-                                            },
-                                            "average_sales": {
-                                                "type": "string",
-                                                "example": "$123.45"
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "404": {
-                            "description": "No sales data found for the given product."
-                        }
-                    },
-                    "security": [
-                        {
-                            "BearerAuth": []
-                        }
-                    ]
-                }
-            },
-            "/sales/employee/total_avg/": {
-                "get": {
-                    "summary": "Get total and average sales by employee",
-                    "description": "Retrieve total and average sales amounts for a spec employee.",
-                    "parameters": [
-                        {
-                            "name": "key_employee",
-                            "in": "query",
-                            "required": True,
-                            "schema": {
-                                "type": "string"
-                            }
-                        }
-                    ],
-                    "responses": {
-                        "200": {
-                            "description": "Total and average sales data retrieved successfully",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "total_sales": {
-                                                "type": "string",
-                                                "example": "$1,234.56"
-                                            },
-                                            "average_sales": {
-                                                "type": "string",
-                                                "example": "$123.45"
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "404": {
-                            "description": "No sales data found for the given employee."
-                        }
-                    },
-                    "security": [
-                        {
-                            "BearerAuth": []
-                        }
-                    ]
-                }
-            },
+            "/sales/employee": _sales_path(
+                "key_employee",
+                "Get sales data by employee",
+                "Retrieve sales data for a specific employee in a date range.",
+                "No sales found for the given employee and date range."
+            ),
+            "/sales/product/": _sales_path(
+                "key_product",
+                "Get sales data by product",
+                "Retrieve sales for a specific product within a date range.",
+                "No sales found for the given product and date range."
+            ),
+            "/sales/store/": _sales_path(
+                "key_store",
+                "Get sales data by store",
+                "Retrieve sales data for a specific store within a date range.",
+                "No sales data found for the given store and date range."
+            ),
+            "/sales/store/total_avg/": _totals_path(
+                "key_store",
+                "Get total and average sales by store",
+                "Retrieve total and average sales amounts for a specific store.",
+                "No sales data found for the given store."
+            ),
+            "/sales/product/total_avg/": _totals_path(
+                "key_product",
+                "Get total and average sales by product",
+                "Retrieve total and average sales amounts for a spec product.",
+                "No sales data found for the given product."
+            ),
+            "/sales/employee/total_avg/": _totals_path(
+                "key_employee",
+                "Get total and average sales by employee",
+                "Retrieve total and average sales amounts for a spec employee.",
+                "No sales data found for the given employee."
+            ),
             "/sales/first_record/": {
                 "get": {
                     "summary": "Get the first record",
@@ -407,11 +414,7 @@ def get_openapi_schema():
                             "description": "No data available."
                         }
                     },
-                    "security": [
-                        {
-                            "BearerAuth": []
-                        }
-                    ]
+                    "security": _BEARER_SEC
                 }
             },
             "/auth/login": {
@@ -473,9 +476,5 @@ def get_openapi_schema():
                 }
             }
         },
-        "security": [
-            {
-                "BearerAuth": []
-            }
-        ]
+        "security": _BEARER_SEC
     }
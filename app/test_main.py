@@ -2,59 +2,193 @@
 This module contains tests for the FastAPI application endpoints.
 
 It includes tests for:
+- Retrieving the OpenAPI schema
 - Login functionality
+- Rejecting requests without credentials
+- Failing with a server error when Firebase cannot be initialized
 - Retrieving sales data by employee, product, store
+- Rejecting malformed and impossible dates
+- Retrieving sales data as an Arrow IPC stream and as NDJSON
+- Projecting sales data onto the requested fields
 - Calculating total and average sales by store, product, and employee
 - Retrieving the first record in the dataset
 """
+# pylint: disable=redefined-outer-name
 
+import json
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pytest
 from fastapi.testclient import TestClient
+from . import main
 from .main import app
+from .routers import sales
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    Provides a TestClient whose application lifespan is entered once for the whole session.
+
+    Yields:
+        TestClient: The client for the FastAPI application.
+    """
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def login(test_client):
+    """
+    Logs in with the test credentials.
+
+    Args:
+        test_client (TestClient): The client for the FastAPI application.
+
+    Returns:
+        Response: The response of the /auth/login endpoint.
+    """
+    return test_client.post("/auth/login", json={"email": "test@mail.com", "password": "Test123"})
+
 
+@pytest.fixture(scope="session")
+def token(client):
+    """
+    Provides a JWT token obtained by logging in once for the whole session.
+
+    Args:
+        client (TestClient): The session-scoped client fixture.
 
-client = TestClient(app)
+    Returns:
+        str: The JWT token.
+    """
+    response = login(client)
+    assert response.status_code == 200
+    return response.json()["token"]
 
 
-def test_login():
+def test_openapi_schema(client):
+    """
+    Test retrieving the OpenAPI schema without credentials.
+
+    Sends a GET request to the /openapi.json endpoint and verifies that the response
+    status code is 200 and the schema documents the sales endpoints.
+    """
+    response = client.get("/openapi.json")
+    assert response.status_code == 200
+    assert "/sales/store/" in response.json()["paths"]
+
+
+def test_login(client):
     """
     Test the login endpoint to ensure it returns a valid JWT token.
 
     Sends a POST request to the /auth/login endpoint with test credentials and
     verifies that the response status code is 200 and contains a token.
-    The token is then stored globally for use in subsequent tests.
     """
-    response = client.post("/auth/login", json={"email": "test@mail.com", "password": "Test123"})
+    response = login(client)
     assert response.status_code == 200
     assert "token" in response.json()
-    global token
-    token = response.json()["token"]
 
 
-def test_get_sales_by_employee():
+def test_missing_credentials(client):
+    """
+    Test that a protected endpoint rejects requests without a JWT token.
+
+    Sends a GET request to the /sales/first_record/ endpoint without an Authorization
+    header and verifies that the response status code is 401.
+    """
+    response = client.get("/sales/first_record/")
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid or missing credentials"}
+
+
+def test_firebase_initialization_error(client, monkeypatch):
+    """
+    Test that a Firebase initialization error is not reported as missing credentials.
+
+    Replaces get_admin_app with one that fails, sends a GET request to the
+    /sales/first_record/ endpoint and verifies that the error reaches the server.
+    """
+    def failing_admin_app():
+        raise ValueError("Missing FIREBASE_PRIVATE_KEY")
+
+    monkeypatch.setattr(main, "get_admin_app", failing_admin_app)
+    with pytest.raises(ValueError):
+        client.get("/sales/first_record/", headers={"Authorization": "Bearer token"})
+
+
+def test_get_sales_by_employee(client, token):
     """
     Test retrieving sales data by employee.
 
     Sends a GET request to the /sales/employee/ endpoint with a valid JWT token
     and verifies that the response status code is 200 and contains at least one record.
 
-    Assumes that the test login has already been performed and the token is valid.
+    Uses the session-scoped token fixture for authentication.
     """
     response = client.get("/sales/employee/", headers={"Authorization": f"Bearer {token}"},
                           params={"key_employee": "1|343",
                                   "start_date": "2023-11-01",
                                   "end_date": "2023-11-03"})
     assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
     assert len(response.json()) >= 1
 
 
-def test_get_sales_by_product():
+def test_get_sales_by_employee_arrow(client, token):
+    """
+    Test retrieving sales data by employee as an Arrow IPC stream.
+
+    Sends a GET request to the /sales/employee/ endpoint accepting
+    application/vnd.apache.arrow.stream and verifies that the response status code is 200
+    and the body decodes to a table with at least one row.
+
+    Uses the session-scoped token fixture for authentication.
+    """
+    response = client.get("/sales/employee/",
+                          headers={"Authorization": f"Bearer {token}",
+                                   "Accept": "application/vnd.apache.arrow.stream"},
+                          params={"key_employee": "1|343",
+                                  "start_date": "2023-11-01",
+                                  "end_date": "2023-11-03"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert pa.ipc.open_stream(response.content).read_all().num_rows >= 1
+
+
+def test_get_sales_by_product_ndjson(client, token):
+    """
+    Test retrieving sales data by product as newline-delimited JSON.
+
+    Sends a GET request to the /sales/product/ endpoint accepting application/x-ndjson
+    and verifies that the response status code is 200 and every line is a JSON object.
+
+    Uses the session-scoped token fixture for authentication.
+    """
+    response = client.get("/sales/product/",
+                          headers={"Authorization": f"Bearer {token}",
+                                   "Accept": "application/x-ndjson"},
+                          params={"key_product": "1|44733",
+                                  "start_date": "2023-11-01",
+                                  "end_date": "2023-11-03"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) >= 1
+    assert all(isinstance(json.loads(line), dict) for line in lines)
+    assert all(re.fullmatch(r"\d{4}-\d{2}-\d{2}", json.loads(line)["KeyDate"]) for line in lines)
+
+
+def test_get_sales_by_product(client, token):
     """
     Test retrieving sales data by product.
 
     Sends a GET request to the /sales/product/ endpoint with a valid JWT token
     and verifies that the response status code is 200 and contains at least one record.
 
-    Assumes that the test login has already been performed and the token is valid.
+    Uses the session-scoped token fixture for authentication.
     """
     response = client.get("/sales/product/", headers={"Authorization": f"Bearer {token}"},
                           params={"key_product": "1|44733",
@@ -64,14 +198,14 @@ def test_get_sales_by_product():
     assert len(response.json()) >= 1
 
 
-def test_get_sales_by_store():
+def test_get_sales_by_store(client, token):
     """
     Test retrieving sales data by store.
 
     Sends a GET request to the /sales/store/ endpoint with a valid JWT token
     and verifies that the response status code is 200 and contains at least one record.
 
-    Assumes that the test login has already been performed and the token is valid.
+    Uses the session-scoped token fixture for authentication.
     """
     response = client.get("/sales/store/", headers={"Authorization": f"Bearer {token}"},
                           params={"key_store": "1|023",
@@ -81,14 +215,98 @@ def test_get_sales_by_store():
     assert len(response.json()) >= 1
 
 
-def test_get_total_avg_sales_by_store():
+def test_get_sales_by_store_wide_date_range(client, token):
+    """
+    Test retrieving sales data by store with dates outside the nanosecond timestamp range.
+
+    Sends GET requests to the /sales/store/ endpoint with a far-future end date and a
+    far-past start date and verifies that both return the matching records.
+
+    Uses the session-scoped token fixture for authentication.
+    """
+    for start_date, end_date in (("2023-11-01", "3000-01-01"), ("1500-01-01", "2023-11-03")):
+        response = client.get("/sales/store/", headers={"Authorization": f"Bearer {token}"},
+                              params={"key_store": "1|023",
+                                      "start_date": start_date,
+                                      "end_date": end_date})
+        assert response.status_code == 200
+        assert len(response.json()) >= 1
+
+
+def test_get_sales_by_store_invalid_dates(client, token):
+    """
+    Test that malformed and impossible dates are rejected.
+
+    Sends GET requests to the /sales/store/ endpoint with dates in the compact and
+    unpadded forms accepted by lenient parsers, and with a well-formed date that does
+    not exist, and verifies that each is rejected with a 400 status code.
+
+    Uses the session-scoped token fixture for authentication.
+    """
+    for start_date in ("20231101", "2023-11-1", "2023-11-01T00:00", "2023-02-30"):
+        response = client.get("/sales/store/", headers={"Authorization": f"Bearer {token}"},
+                              params={"key_store": "1|023",
+                                      "start_date": start_date,
+                                      "end_date": "2023-11-03"})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid date format. Use YYYY-MM-DD."}
+
+
+def test_get_sales_by_store_fields(client, token):
+    """
+    Test retrieving only the requested fields of the sales data by store.
+
+    Sends a GET request to the /sales/store/ endpoint with the fields parameter and
+    verifies that every record contains exactly the requested columns, and that an
+    unknown field is rejected with a 400 status code.
+
+    Uses the session-scoped token fixture for authentication.
+    """
+    params = {"key_store": "1|023",
+              "start_date": "2023-11-01",
+              "end_date": "2023-11-03",
+              "fields": ["KeyDate", "KeyStore"]}
+    response = client.get("/sales/store/", headers={"Authorization": f"Bearer {token}"},
+                          params=params)
+    assert response.status_code == 200
+    assert all(set(record) == {"KeyDate", "KeyStore"} for record in response.json())
+    assert all(re.fullmatch(r"\d{4}-\d{2}-\d{2}", record["KeyDate"])
+               for record in response.json())
+
+    response = client.get("/sales/store/", headers={"Authorization": f"Bearer {token}"},
+                          params={**params, "fields": ["Unknown"]})
+    assert response.status_code == 400
+
+
+def test_get_sales_by_store_duplicate_fields_arrow(client, token):
+    """
+    Test retrieving repeated fields of the sales data by store as an Arrow IPC stream.
+
+    Sends a GET request to the /sales/store/ endpoint with a field requested twice and
+    verifies that the response status code is 200 and the table has the field only once.
+
+    Uses the session-scoped token fixture for authentication.
+    """
+    response = client.get("/sales/store/",
+                          headers={"Authorization": f"Bearer {token}",
+                                   "Accept": "application/vnd.apache.arrow.stream"},
+                          params={"key_store": "1|023",
+                                  "start_date": "2023-11-01",
+                                  "end_date": "2023-11-03",
+                                  "fields": ["KeyStore", "KeyDate", "KeyStore"]})
+    assert response.status_code == 200
+    assert pa.ipc.open_stream(response.content).read_all().column_names == ["KeyStore",
+                                                                            "KeyDate"]
+
+
+def test_get_total_avg_sales_by_store(client, token):
     """
     Test retrieving total and average sales data by store.
 
     Sends a GET request to the /sales/store/total_avg/ endpoint with a valid JWT token
     and verifies that the response status code is 200 and the response is a dictionary.
 
-    Assumes that the test login has already been performed and the token is valid.
+    Uses the session-scoped token fixture for authentication.
     """
     response = client.get("/sales/store/total_avg/",
                           headers={"Authorization": f"Bearer {token}"},
@@ -97,14 +315,29 @@ def test_get_total_avg_sales_by_store():
     assert isinstance(response.json(), dict)
 
 
-def test_get_total_avg_sales_by_product():
+def test_get_total_avg_sales_by_unknown_store(client, token):
+    """
+    Test retrieving total and average sales data for a store without sales.
+
+    Sends a GET request to the /sales/store/total_avg/ endpoint with a key that does not
+    exist and verifies that the response status code is 404.
+
+    Uses the session-scoped token fixture for authentication.
+    """
+    response = client.get("/sales/store/total_avg/",
+                          headers={"Authorization": f"Bearer {token}"},
+                          params={"key_store": "unknown"})
+    assert response.status_code == 404
+
+
+def test_get_total_avg_sales_by_product(client, token):
     """
     Test retrieving total and average sales data by product.
 
     Sends a GET request to the /sales/product/total_avg/ endpoint with a valid JWT token
     and verifies that the response status code is 200 and the response is a dictionary.
 
-    Assumes that the test login has already been performed and the token is valid.
+    Uses the session-scoped token fixture for authentication.
     """
     response = client.get("/sales/product/total_avg/",
                           headers={"Authorization": f"Bearer {token}"},
@@ -113,14 +346,14 @@ def test_get_total_avg_sales_by_product():
     assert isinstance(response.json(), dict)
 
 
-def test_get_total_avg_sales_by_employee():
+def test_get_total_avg_sales_by_employee(client, token):
     """
     Test retrieving total and average sales data by employee.
 
     Sends a GET request to the /sales/employee/total_avg/ endpoint with a valid JWT token
     and verifies that the response status code is 200 and the response is a dictionary.
 
-    Assumes that the test login has already been performed and the token is valid.
+    Uses the session-scoped token fixture for authentication.
     """
     response = client.get("/sales/employee/total_avg/",
                           headers={"Authorization": f"Bearer {token}"},
@@ -129,16 +362,43 @@ def test_get_total_avg_sales_by_employee():
     assert isinstance(response.json(), dict)
 
 
-def test_get_first_record():
+def test_get_first_record(client, token):
     """
     Test retrieving the first record in the dataset.
 
     Sends a GET request to the /sales/first_record/ endpoint with a valid JWT token
-    and verifies that the response status code is 200 and the response is a dictionary.
+    and verifies that the response status code is 200, the response is a dictionary and
+    the derived NetAmount values are not served as a field.
 
-    Assumes that the test login has already been performed and the token is valid.
+    Uses the session-scoped token fixture for authentication.
     """
     response = client.get("/sales/first_record/",
                           headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
     assert isinstance(response.json(), dict)
+    assert "NetAmount" not in response.json()
+
+
+def test_get_first_record_null_field(client, token, monkeypatch):
+    """
+    Test that a missing value in the first record is returned as JSON null.
+
+    Replaces the dataset with a single row whose Tickets value is missing, sends a GET
+    request to the /sales/first_record/ endpoint and verifies that the field is null and
+    KeyDate is served as a date.
+
+    Uses the session-scoped token fixture for authentication.
+    """
+    first_table = pa.table({
+        "KeyDate": ["2023-11-01"],
+        "KeyStore": ["1|023"],
+        "Tickets": pa.array([None], type=pa.struct([("NetAmount", pa.float64())]))
+    })
+    first_df = first_table.to_pandas(types_mapper=pd.ArrowDtype)
+    first_df["KeyDate"] = pd.to_datetime(first_df["KeyDate"]).astype(pd.ArrowDtype(pa.date32()))
+    monkeypatch.setattr(sales, "table", first_table)
+    monkeypatch.setattr(sales, "df", first_df)
+    response = client.get("/sales/first_record/",
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == {"KeyDate": "2023-11-01", "KeyStore": "1|023", "Tickets": None}
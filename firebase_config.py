@@ -1,7 +1,11 @@
 import pyrebase
 import firebase_admin
 import os
+import threading
+import time
 
+from functools import lru_cache
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from firebase_admin import credentials, auth
 
@@ -19,25 +23,49 @@ firebaseConfig = {
   "databaseURL": os.getenv('FIREBASE_DATABASE_URL')
 }
 
-service_account_info = {
-  "type": os.getenv('FIREBASE_TYPE'),
-  "project_id": os.getenv('FIREBASE_PROJECT_ID'),
-  "private_key_id": os.getenv('FIREBASE_PRIVATE_KEY_ID'),
-  "private_key": os.getenv('FIREBASE_PRIVATE_KEY').replace('\\n', '\n'),
-  "client_email": os.getenv('FIREBASE_CLIENT_EMAIL'),
-  "client_id": os.getenv('FIREBASE_CLIENT_ID'),
-  "auth_uri": os.getenv('FIREBASE_AUTH_URI'),
-  "token_uri": os.getenv('FIREBASE_TOKEN_URI'),
-  "auth_provider_x509_cert_url": os.getenv('FIREBASE_AUTH_PROVIDER_X509_CERT_URL'),
-  "client_x509_cert_url": os.getenv('FIREBASE_CLIENT_X509_CERT_URL')
-}
 
-firebase = pyrebase.initialize_app(firebaseConfig)
-firebase_auth = firebase.auth()
+def get_service_account_info():
+    return {
+        "type": os.getenv('FIREBASE_TYPE'),
+        "project_id": os.getenv('FIREBASE_PROJECT_ID'),
+        "private_key_id": os.getenv('FIREBASE_PRIVATE_KEY_ID'),
+        "private_key": os.getenv('FIREBASE_PRIVATE_KEY').replace('\\n', '\n'),
+        "client_email": os.getenv('FIREBASE_CLIENT_EMAIL'),
+        "client_id": os.getenv('FIREBASE_CLIENT_ID'),
+        "auth_uri": os.getenv('FIREBASE_AUTH_URI'),
+        "token_uri": os.getenv('FIREBASE_TOKEN_URI'),
+        "auth_provider_x509_cert_url": os.getenv('FIREBASE_AUTH_PROVIDER_X509_CERT_URL'),
+        "client_x509_cert_url": os.getenv('FIREBASE_CLIENT_X509_CERT_URL')
+    }
+
+
+# The Firebase clients are created on first use rather than at import, so starting the
+# app or collecting tests does not pay for the key parsing and initialization.
+@lru_cache(maxsize=1)
+def get_firebase_auth():
+    firebase = pyrebase.initialize_app(firebaseConfig)
+    return firebase.auth()
+
+
+@lru_cache(maxsize=1)
+def get_admin_app():
+    cred = credentials.Certificate(get_service_account_info())
+    return firebase_admin.initialize_app(cred)
+
 
-cred = credentials.Certificate(service_account_info)
-firebase_admin.initialize_app(cred)
+# Verified tokens are reused for a few minutes, so repeated requests with the same
+# bearer token skip the signature check. A cached token is only reused while its own
+# exp claim is more than TOKEN_EXPIRY_MARGIN seconds away.
+TOKEN_EXPIRY_MARGIN = 30
+token_cache = TTLCache(maxsize=10000, ttl=300)
+token_cache_lock = threading.Lock()
 
 
 def verify_token_local(token):
-    return auth.verify_id_token(token)
+    with token_cache_lock:
+        decoded_token = token_cache.get(token)
+    if decoded_token is None or decoded_token['exp'] <= time.time() + TOKEN_EXPIRY_MARGIN:
+        decoded_token = auth.verify_id_token(token, app=get_admin_app())
+        with token_cache_lock:
+            token_cache[token] = decoded_token
+    return decoded_token